@@ -7,6 +7,7 @@ user on ``flask.g`` for downstream handlers.
 from flask import g, jsonify
 from flask_httpauth import HTTPBasicAuth
 
+from app import db
 from app.models import User
 from app.security import limiter
 
@@ -28,10 +29,14 @@ def verify_password(email_or_token, password):
         return g.current_user is not None
     user = User.query.filter_by(email=email_or_token).first()
     if not user:
-        return False
+        return User.verify_unknown_passwd(password)
     g.current_user = user
     g.token_used = False
-    return user.verify_passwd(password)
+    if not user.verify_passwd(password):
+        return False
+    if user in db.session.dirty:
+        db.session.commit()  # verification upgraded the hash
+    return True
 
 
 @auth.error_handler
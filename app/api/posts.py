@@ -58,7 +58,7 @@ def edit_post(id):
     post = post_service.get_post(id)
     if post is None:
         return not_found('post not found')
-    if g.current_user != post.author and not g.current_user.can(Permission.ADMINISTER):
+    if g.current_user.id != post.author_id and not g.current_user.can(Permission.ADMINISTER):
         return not_found('post not found')
     try:
         data = post_schema.load(request.get_json(silent=True) or {})
@@ -8,58 +8,57 @@ from wtforms import (
 )
 from wtforms.validators import DataRequired, Email, EqualTo, Length, Regexp
 
-from ..models import User
+from ..helper.uniqueness import is_email_taken, is_username_taken
+
+# Cheap shape check for forms that only look an address up or replace it.
+# Full ``Email()`` validation pulls in email_validator (and dnspython), so it is
+# kept for registration where the address is first accepted.
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+$'
 
 
 class LoginForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Length(1, 64),
-                                             Email()], render_kw={'style': 'margin-top: 15px;'})
-    password = PasswordField('Password', validators=[DataRequired()],
-                             render_kw={'style': 'margin-top: 15px;'})
-    remember_me = BooleanField('Keep me logged in', render_kw={'style': 'margin-top: 15px;'})
-    submit = SubmitField('Log In', render_kw={'style': 'margin-top: 15px;'})
+                                             Regexp(EMAIL_PATTERN, 0, 'Invalid email address.')])
+    password = PasswordField('Password', validators=[DataRequired()])
+    remember_me = BooleanField('Keep me logged in')
+    submit = SubmitField('Log In')
 
 
 class RegistrationForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Length(1, 64),
-                                             Email()], render_kw={'style': 'margin-top: 15px;'})
+                                             Email()])
     username = StringField('Username', validators=[
         DataRequired(), Length(1, 64), Regexp('^[A-Za-z][A-Za-z0-9_.]*$', 0,
                                               'Usernames must have only letters, '
-                                              'numbers, dots or underscores')],
-                                              render_kw={'style': 'margin-top: 15px;'})
+                                              'numbers, dots or underscores')])
     password = PasswordField('Password', validators=[
-        DataRequired(), EqualTo('password2', message='Passwords must match.')],
-        render_kw={'style': 'margin-top: 15px;'})
-    password2 = PasswordField('Confirm password', validators=[DataRequired()],
-                              render_kw={'style': 'margin-top: 15px;'})
-    submit = SubmitField('Register', render_kw={'style': 'margin-top: 15px;'})
+        DataRequired(), EqualTo('password2', message='Passwords must match.')])
+    password2 = PasswordField('Confirm password', validators=[DataRequired()])
+    submit = SubmitField('Register')
 
     def validate_email(self, field):
-        if User.query.filter_by(email=field.data).first():
+        if is_email_taken(field.data):
             raise ValidationError('Email already registered.')
 
     '''
     The methods starting with validate_* are called for validation similar to DataRequired()
     '''
     def validate_username(self, field):
-        if User.query.filter_by(username=field.data).first():
+        if is_username_taken(field.data):
             raise ValidationError('Username already in use.')
 
 
 class PasswdChangeForm(FlaskForm):
     password = PasswordField('New Password', validators=[
-        DataRequired(), EqualTo('password2', message='Passwords must match.')],
-        render_kw={'style': 'margin-top: 15px;'})
-    password2 = PasswordField('Confirm password', validators=[DataRequired()],
-                              render_kw={'style': 'margin-top: 15px;'})
-    submit = SubmitField('Change',render_kw={'style': 'margin-top: 15px;'})
+        DataRequired(), EqualTo('password2', message='Passwords must match.')])
+    password2 = PasswordField('Confirm password', validators=[DataRequired()])
+    submit = SubmitField('Change')
 
 
 class ChangeEmailForm(FlaskForm):
     email = StringField('New Email', validators=[DataRequired(), Length(1, 64),
-                                             Email()], render_kw={'style': 'margin-top: 15px;'})
-    submit = SubmitField('Change', render_kw={'style': 'margin-top: 15px;'})
+                                             Regexp(EMAIL_PATTERN, 0, 'Invalid email address.')])
+    submit = SubmitField('Change')
 
 
 class YesNoForm(FlaskForm):
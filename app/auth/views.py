@@ -17,7 +17,11 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user is not None and user.verify_passwd(form.password.data):
+        if user is None:
+            User.verify_unknown_passwd(form.password.data)
+        elif user.verify_passwd(form.password.data):
+            if user in db.session.dirty:
+                db.session.commit()  # verification upgraded the hash
             login_user(user, form.remember_me.data)
             # 'next' holds the protected page the user was heading to before being
             # bounced to login; fall back to the index if it is absent.
@@ -104,9 +108,8 @@ def resend_confirmation():
 def change_password():
     form = PasswdChangeForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=current_user.email).first()
+        user = current_user._get_current_object()
         user.password = form.password.data
-        db.session.add(user)
         db.session.commit()
         flash('Password has been updated!', 'info')
         return redirect(url_for('main.index'))
@@ -119,7 +122,7 @@ def delete_account():
     form = YesNoForm()
     if form.is_submitted():
         if form.yes_button.data:
-            user = User.query.filter_by(email=current_user.email).first()
+            user = current_user._get_current_object()
             logout_user()
             db.session.delete(user)
             db.session.commit()
@@ -133,9 +136,8 @@ def delete_account():
 def change_email():
     form = ChangeEmailForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=current_user.email).first()
+        user = current_user._get_current_object()
         user.email = form.email.data
-        db.session.add(user)
         db.session.commit()
         flash('Email has been updated!', 'info')
         return redirect(url_for('main.index'))
@@ -2,10 +2,13 @@
 
 Sending is dispatched to a Celery worker so it never blocks the request thread.
 Under the testing profile (``CELERY_TASK_ALWAYS_EAGER``) the task runs inline.
-If Celery/broker wiring is unavailable, we fall back to sending synchronously so
-local development without a broker still works.
+If Celery/broker wiring is unavailable, the message is rendered in the request
+and handed to a small in-process thread pool, so local development without a
+broker still works and the response isn't held up by SMTP.
 """
-from flask import current_app, render_template
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
 from flask_mail import Message
 
 from . import mail
@@ -13,22 +16,65 @@ from .tasks import send_email_task
 
 
 def send_email(to, subject, template, **kwargs):
-    """Queue an email for delivery (async via Celery, sync as a fallback)."""
+    """Queue an email for delivery (async via Celery, a local thread as a fallback)."""
     try:
         return send_email_task.delay(to, subject, template, **kwargs)
     except Exception:
         current_app.logger.warning(
-            'Celery dispatch failed; sending email synchronously', exc_info=True)
-        return _send_sync(to, subject, template, **kwargs)
+            'Celery dispatch failed; sending email from a local thread', exc_info=True)
+        return _send_in_thread(to, subject, template, **kwargs)
 
 
-def _send_sync(to, subject, template, **kwargs):
-    prefix = current_app.config['BLOGIFY_MAIL_SUBJECT_PREFIX']
+def build_message(to, subject, template, **kwargs):
+    """Return a rendered Message for ``template`` (``.txt`` and ``.html`` parts)."""
+    config = current_app.config
     message = Message(
-        f"{prefix} {subject}",
-        sender=current_app.config['BLOGIFY_MAIL_SENDER'],
+        f"{config['BLOGIFY_MAIL_SUBJECT_PREFIX']} {subject}",
+        sender=config['BLOGIFY_MAIL_SENDER'],
         recipients=[to],
     )
-    message.body = render_template(f"{template}.txt", **kwargs)
-    message.html = render_template(f"{template}.html", **kwargs)
-    mail.send(message)
+    text, html = _email_templates(template)
+    message.body = text.render(**kwargs)
+    message.html = html.render(**kwargs)
+    return message
+
+
+def _email_templates(template):
+    """Return the compiled (txt, html) templates, resolved once per app.
+
+    Email templates only use their own arguments and Jinja globals such as
+    ``url_for``, so they are rendered directly rather than through
+    ``render_template`` and its context processors.
+    """
+    app = current_app._get_current_object()
+    templates = app.extensions.setdefault('email_templates', {})
+    pair = templates.get(template)
+    if pair is None:
+        pair = (app.jinja_env.get_template(f"{template}.txt"),
+                app.jinja_env.get_template(f"{template}.html"))
+        templates[template] = pair
+    return pair
+
+
+def _send_in_thread(to, subject, template, **kwargs):
+    app = current_app._get_current_object()
+    # Templates need the request/app context, so render before handing off.
+    message = build_message(to, subject, template, **kwargs)
+    return _mail_executor(app).submit(_deliver, app, message)
+
+
+def _mail_executor(app):
+    """Return the app's mail thread pool, creating it on first use."""
+    executor = app.extensions.get('mail_executor')
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='mail')
+        app.extensions['mail_executor'] = executor
+    return executor
+
+
+def _deliver(app, message):
+    with app.app_context():
+        try:
+            mail.send(message)
+        except Exception:
+            app.logger.exception('Failed to send email to %s', message.recipients)
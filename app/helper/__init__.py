@@ -1,10 +1,33 @@
 """Template helper utilities."""
-import humanize
-import pendulum
+from datetime import datetime
+
+# (seconds, unit) pairs, largest first, for the relative-time ladder below.
+_UNITS = (
+    (365 * 24 * 60 * 60, 'year'),
+    (30 * 24 * 60 * 60, 'month'),
+    (24 * 60 * 60, 'day'),
+    (60 * 60, 'hour'),
+    (60, 'minute'),
+)
 
 
 def format_relative_time(dt):
-    """Return a human-friendly relative time string (e.g. "3 hours ago")."""
-    localized = pendulum.instance(dt, tz=pendulum.local_timezone())
-    delta = pendulum.now() - localized
-    return humanize.naturaldelta(delta)
+    """Return a human-friendly elapsed time (e.g. "3 hours"); templates append "ago".
+
+    Naive datetimes are treated as server local time, which is how the model
+    defaults store them. Wording follows humanize's ``naturaldelta`` ("a
+    second", "an hour", "3 days"), except that only the largest unit is given,
+    so 400 days is "a year" rather than "1 year, 1 month".
+    """
+    seconds = abs((datetime.now().astimezone() - dt.astimezone()).total_seconds())
+    if seconds < 1:
+        return 'a moment'
+    if seconds < 60:
+        count = int(seconds)
+        return 'a second' if count == 1 else f'{count} seconds'
+    for size, unit in _UNITS:
+        if seconds >= size:
+            count = int(seconds // size)
+            if count == 1:
+                return f"{'an' if unit == 'hour' else 'a'} {unit}"
+            return f'{count} {unit}s'
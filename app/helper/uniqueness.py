@@ -0,0 +1,49 @@
+"""Request-scoped memoized uniqueness checks for user fields.
+
+Registration and the admin profile form both ask "is this email/username
+already taken?"; a single request can ask more than once (re-validation, the
+same value on two forms), so answers are cached for the life of the request.
+"""
+from flask import g, has_request_context, request
+
+from .. import db
+from ..models import User
+
+
+def _request_cache():
+    """Return the memo dict for the current request, or None outside one.
+
+    ``g`` belongs to the app context, which can outlive a single request (e.g.
+    a test client under an outer app context), so the cache is tagged with the
+    request that created it and rebuilt when that changes.
+    """
+    if not has_request_context():
+        return None
+    current = request._get_current_object()
+    owner, cache = g.get('_uniqueness_cache', (None, None))
+    if owner is not current:
+        cache = {}
+        g._uniqueness_cache = (current, cache)
+    return cache
+
+
+def _exists(column, value):
+    cache = _request_cache()
+    key = (column.key, value)
+    if cache is not None and key in cache:
+        return cache[key]
+    # Select only the primary key; there's no need to hydrate a full User.
+    found = db.session.query(User.id).filter(column == value).first() is not None
+    if cache is not None:
+        cache[key] = found
+    return found
+
+
+def is_email_taken(email):
+    """True if a user is already registered with ``email``."""
+    return _exists(User.email, email)
+
+
+def is_username_taken(username):
+    """True if a user already has ``username``."""
+    return _exists(User.username, username)
@@ -10,46 +10,40 @@ from wtforms import (
 )
 from wtforms.validators import DataRequired, Email, Length, Regexp
 
-from ..models import Role, User
+from ..helper.uniqueness import is_email_taken, is_username_taken
+from ..models import Role
 
 
 class EditProfileForm(FlaskForm):
-    name = StringField('Real name', validators=[Length(0, 64)], render_kw={
-                       'style': 'margin-top: 15px;'})
-    location = StringField('Location', validators=[Length(
-        0, 64)], render_kw={'style': 'margin-top: 15px;'})
-    about_me = TextAreaField('About me', render_kw={'style': 'height: 240px; margin-top: 15px;'})
-    submit = SubmitField('Submit', render_kw={'style': 'margin-top: 15px;'})
+    name = StringField('Real name', validators=[Length(0, 64)])
+    location = StringField('Location', validators=[Length(0, 64)])
+    about_me = TextAreaField('About me', render_kw={'style': 'height: 240px;'})
+    submit = SubmitField('Submit')
 
 
 class CommentForm(FlaskForm):
     body = StringField('', validators=[DataRequired()])
-    submit = SubmitField('Submit', render_kw={'style': 'margin-top: 15px;'})
+    submit = SubmitField('Submit')
 
 
 class EditProfileAdminForm(FlaskForm):
 
     email = StringField('Email', validators=[DataRequired(), Length(1, 64),
-                                             Email()], render_kw={'style': 'margin-top: 15px;'})
+                                             Email()])
     username = StringField('Username', validators=[
         DataRequired(), Length(1, 64), Regexp('^[A-Za-z][A-Za-z0-9_.]*$', 0,
                                               'Usernames must have only letters, '
-                                              'numbers, dots or underscores')], render_kw={'style': 'margin-top: 15px;'})
+                                              'numbers, dots or underscores')])
     confirmed = BooleanField('Confirmed')
-    role = SelectField('Role', coerce=int, render_kw={
-                       'style': 'margin-top: 15px;'})
-    name = StringField('Real name', validators=[Length(0, 64)], render_kw={
-                       'style': 'margin-top: 15px;'})
-    location = StringField('Location', validators=[Length(
-        0, 64)], render_kw={'style': 'margin-top: 15px;'})
-    about_me = TextAreaField('About me', render_kw={
-                             'style': 'margin-top: 15px;'})
-    submit = SubmitField('Submit', render_kw={'style': 'margin-top: 15px;'})
+    role = SelectField('Role', coerce=int)
+    name = StringField('Real name', validators=[Length(0, 64)])
+    location = StringField('Location', validators=[Length(0, 64)])
+    about_me = TextAreaField('About me')
+    submit = SubmitField('Submit')
 
     def __init__(self, user, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.role.choices = [(role.id, role.name)
-                             for role in Role.query.order_by(Role.name).all()]
+        self.role.choices = Role.choices()
         self.user = user
 
     '''
@@ -58,12 +52,12 @@ class EditProfileAdminForm(FlaskForm):
 
     def validate_email(self, field):
         if field.data != self.user.email and \
-                User.query.filter_by(email=field.data).first():
+                is_email_taken(field.data):
             raise ValidationError('Email already registered.')
 
     def validate_username(self, field):
         if field.data != self.user.username and \
-                User.query.filter_by(username=field.data).first():
+                is_username_taken(field.data):
             raise ValidationError('Username already in use.')
 
 
@@ -79,5 +73,5 @@ class PostForm(FlaskForm):
         {{ pagedown.include_pagedown() }}
     '''
     body = PageDownField("What's on your mind?", validators=[DataRequired()],
-                         render_kw={'style': 'height: 400px; margin-top: 15px;'})
-    submit = SubmitField('Post', render_kw={'style': 'margin-top: 15px;'})
+                         render_kw={'style': 'height: 400px;'})
+    submit = SubmitField('Post')
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from flask import (
     abort,
     current_app,
@@ -9,19 +11,23 @@ from flask import (
     url_for,
 )
 from flask_login import current_user, login_required
+from sqlalchemy.orm import joinedload, lazyload, selectinload
 
+from .. import db
 from ..decorators import admin_required, permission_required
-from ..models import Comment, Permission, Post, Role, User
+from ..models import Comment, Follow, Permission, Post, Role, User
 from ..services import comments as comment_service
 from ..services import posts as post_service
 from . import main
 from .forms import CommentForm, EditProfileAdminForm, EditProfileForm, PostForm
 
 
+# The feed toggles render the feed directly and set the cookie on that
+# response, rather than redirecting to the index just to set it.
 @main.route('/all')
 @login_required
 def show_all():
-    resp = make_response(redirect(url_for('.index')))
+    resp = make_response(_render_feed(PostForm(), show_followed=False))
     resp.set_cookie('show_followed', '', max_age=30*24*60*60) # 30 days
     return resp
 
@@ -29,7 +35,7 @@ def show_all():
 @main.route('/followed')
 @login_required
 def show_followed():
-    resp = make_response(redirect(url_for('.index')))
+    resp = make_response(_render_feed(PostForm(), show_followed=True))
     resp.set_cookie('show_followed', '1', max_age=30*24*60*60) # 30 days
     return resp
 
@@ -48,17 +54,39 @@ def index():
     show_followed = False
     if current_user.is_authenticated:
         show_followed = bool(request.cookies.get('show_followed', ''))
+    return _render_feed(form, show_followed)
+
+
+def _render_feed(form, show_followed):
+    """Render one page of the all-posts or followed-posts feed."""
     if show_followed:
         query = current_user.followed_posts
     else:
         query = Post.query
-    page = request.args.get('page', 1, type=int)
-    pagination = query.order_by(Post.timestamp.desc()).paginate(
-        page=page, per_page=5,
-        error_out=False)
-    posts = pagination.items
+    feed = post_service.keyset_page(
+        query.options(selectinload(Post.author)),
+        per_page=current_app.config['BLOGIFY_POSTS_PER_PAGE'],
+        after=_cursor_arg('after'),
+        before=_cursor_arg('before'))
+    older_url = newer_url = None
+    if feed.older:
+        older_url = url_for('.index', after_ts=feed.older[0].isoformat(),
+                            after_id=feed.older[1])
+    if feed.newer:
+        newer_url = url_for('.index', before_ts=feed.newer[0].isoformat(),
+                            before_id=feed.newer[1])
     return render_template('index.html', show_followed=show_followed,
-                           form=form, posts=posts, pagination=pagination)
+                           form=form, posts=feed.items,
+                           older_url=older_url, newer_url=newer_url)
+
+
+def _cursor_arg(prefix):
+    """Read a ``(timestamp, id)`` feed cursor from ``<prefix>_ts``/``<prefix>_id``."""
+    timestamp = request.args.get(f'{prefix}_ts', type=datetime.fromisoformat)
+    post_id = request.args.get(f'{prefix}_id', type=int)
+    if timestamp is None or post_id is None:
+        return None
+    return timestamp, post_id
 
 
 @main.route('/user/<username>')
@@ -73,13 +101,11 @@ def user(username):
 @main.route('/edit-profile', methods=['GET', 'POST'])
 @login_required
 def edit_profile():
-    from .. import db
     form = EditProfileForm()
     if form.validate_on_submit():
         current_user.username = form.name.data
         current_user.location = form.location.data
         current_user.about_me = form.about_me.data
-        db.session.add(current_user)
         db.session.commit()
         flash('Your profile has been updated.')
         return redirect(url_for('.user', username=current_user.username))
@@ -94,18 +120,16 @@ def edit_profile():
 @admin_required
 def edit_profile_admin(id):
 
-    user = User.query.get_or_404(id)
+    user = db.get_or_404(User, id)
     form = EditProfileAdminForm(user=user)
     if form.validate_on_submit():
         user.email = form.email.data
         user.username = form.username.data
         user.confirmed = form.confirmed.data
-        user.role = Role.query.get(form.role.data)
+        user.role = db.session.get(Role, form.role.data)
         user.username = form.name.data
         user.location = form.location.data
         user.about_me = form.about_me.data
-        from .. import db
-        db.session.add(user)
         db.session.commit()
         flash('The profile has been updated.')
         return redirect(url_for('.user', username=user.username))
@@ -121,7 +145,9 @@ def edit_profile_admin(id):
 
 @main.route('/post/<int:id>', methods=['GET', 'POST'])
 def post(id):
-    post = Post.query.get_or_404(id)
+    post = post_service.get_post(id)
+    if post is None:
+        abort(404)
     form = CommentForm()
     if current_user.can(Permission.COMMENT) and form.validate_on_submit():
         comment_service.create_comment(
@@ -130,28 +156,26 @@ def post(id):
             author=current_user._get_current_object())
         flash('Your comment has been published.')
         return redirect(url_for('.post', id=post.id, page=-1))
+    per_page = current_app.config['BLOGIFY_COMMENTS_PER_PAGE']
     page = request.args.get('page', 1, type=int)
     if page == -1:
-        page = post.comments.count() // \
-            current_app.config['BLOGIFY_COMMENTS_PER_PAGE'] + 1
-    pagination = post.comments.order_by(Comment.timestamp.asc()).paginate(
-                            page=page, per_page=current_app.config['BLOGIFY_COMMENTS_PER_PAGE'],
-                            error_out=False)
+        # Jump to the last page using the cached count rather than a COUNT(*).
+        page = max(post.comment_count - 1, 0) // per_page + 1
+    pagination = comment_service.list_comments_for_post(
+        post, page=page, per_page=per_page)
     comments = pagination.items
     return render_template('post.html', viewed_post=post,
                            form=form,
                            pagination=pagination,
                            endpoint='.post',
-                           comments=comments,
-                           posts=Post.query.order_by(
-                           Post.timestamp.desc())[:5])
+                           comments=comments)
 
 
 @main.route('/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 def edit(id):
-    post = Post.query.get_or_404(id)
-    if current_user != post.author and not current_user.can(Permission.ADMINISTER):
+    post = db.get_or_404(Post, id)
+    if current_user.id != post.author_id and not current_user.can(Permission.ADMINISTER):
         abort(403)
     form = PostForm()
     if form.validate_on_submit():
@@ -172,11 +196,9 @@ def follow(username):
     if user is None:
         flash('Invalid user.')
         return redirect(url_for('.index'))
-    if current_user.is_following(user):
+    if not current_user.follow(user):
         flash('You are already following this user.')
         return redirect(url_for('.user', username=username))
-    from .. import db
-    current_user.follow(user)
     db.session.commit()
     flash(f'You are now following {username}.')
     return redirect(url_for('.user', username=username))
@@ -190,7 +212,6 @@ def unfollow(username):
     if user is None:
         flash('Invalid user.')
         return redirect(url_for('.index'))
-    from .. import db
     current_user.unfollow(user)
     db.session.commit()
     flash(f'You unfollowed {username}.')
@@ -204,7 +225,10 @@ def followers(username):
         flash('Invalid user.')
         return redirect(url_for('.index'))
     page = request.args.get('page', 1, type=int)
-    pagination = user.followers.paginate(
+    # Follow joins both users by default; the followed side is always `user`
+    # here, so only the follower is loaded.
+    pagination = user.followers.options(
+        joinedload(Follow.follower), lazyload(Follow.followed)).paginate(
         page=page, per_page=10,
         error_out=False)
     follows = [{'user': item.follower, 'timestamp': item.timestamp}
@@ -219,9 +243,8 @@ def followers(username):
 @permission_required(Permission.MODERATE_COMMENTS)
 def moderate():
     page = request.args.get('page', 1, type=int)
-    pagination = Comment.query.order_by(Comment.timestamp.desc()).paginate(
-                page=page, per_page=current_app.config['BLOGIFY_COMMENTS_PER_PAGE'],
-                error_out=False)
+    pagination = comment_service.list_all_comments(
+        page=page, per_page=current_app.config['BLOGIFY_COMMENTS_PER_PAGE'])
     comments = pagination.items
     return render_template('moderate.html', comments=comments,
         pagination=pagination, page=page)
@@ -231,11 +254,8 @@ def moderate():
 @login_required
 @permission_required(Permission.MODERATE_COMMENTS)
 def moderate_enable(id):
-    from .. import db
-    comment = Comment.query.get_or_404(id)
-    comment.disabled = False
-    db.session.add(comment)
-    db.session.commit()
+    comment = db.get_or_404(Comment, id)
+    comment_service.set_disabled(comment, False)
     return redirect(url_for('.moderate',
                     page=request.args.get('page', 1, type=int)))
 
@@ -244,11 +264,8 @@ def moderate_enable(id):
 @login_required
 @permission_required(Permission.MODERATE_COMMENTS)
 def moderate_disable(id):
-    from .. import db
-    comment = Comment.query.get_or_404(id)
-    comment.disabled = True
-    db.session.add(comment)
-    db.session.commit()
+    comment = db.get_or_404(Comment, id)
+    comment_service.set_disabled(comment, True)
     return redirect(url_for('.moderate',
                             page=request.args.get('page', 1, type=int)))
 
@@ -257,10 +274,7 @@ def moderate_disable(id):
 @login_required
 @permission_required(Permission.MODERATE_COMMENTS)
 def delete_comment(id):
-    from .. import db
-    comment = Comment.query.get_or_404(id)
-    comment.disabled = True
-    db.session.delete(comment)
-    db.session.commit()
+    comment = db.get_or_404(Comment, id)
+    comment_service.delete_comment(comment)
     return redirect(url_for('.moderate',
                             page=request.args.get('page', 1, type=int)))
@@ -4,23 +4,106 @@ Roles map to bitmask permission sets; a user's role determines what actions
 they may perform. Post/Comment bodies are rendered to sanitized HTML on write
 via SQLAlchemy ``set`` events, with server-side syntax highlighting for code.
 """
+import functools
 import hashlib
+import threading
+from datetime import datetime
 
 import bleach
-import pendulum
-from bs4 import BeautifulSoup
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError
+from bleach.linkifier import LinkifyFilter
 from flask import current_app, url_for
 from flask_login import AnonymousUserMixin, UserMixin
 from itsdangerous import BadData, URLSafeTimedSerializer
-from markdown import markdown
+from markdown_it import MarkdownIt
 from pygments import highlight
 from pygments.formatters import HtmlFormatter
 from pygments.lexers import get_lexer_by_name
-from werkzeug.security import check_password_hash, generate_password_hash
+from pygments.util import ClassNotFound
+from selectolax.lexbor import LexborHTMLParser
+from sqlalchemy.orm import joinedload
+from werkzeug.security import check_password_hash
 
 from app.exceptions import ValidationError
 
-from . import db, login_manager
+from . import cache, db, login_manager
+
+# Argon2id with an explicit work factor. Hashes made with other parameters (or
+# by Werkzeug before the switch) are upgraded on the next successful login.
+_PASSWORD_HASHER = PasswordHasher(time_cost=3, memory_cost=64 * 1024,
+                                  parallelism=1)
+
+
+@functools.cache
+def _dummy_password_hash():
+    return _PASSWORD_HASHER.hash('not-a-real-password')
+
+
+# Tags a rendered comment may keep; everything else is stripped.
+COMMENT_ALLOWED_TAGS = ['a', 'abbr', 'acronym', 'b', 'code', 'em', 'i',
+                        'strong', 'pre']
+
+# Tags and attributes a rendered post may keep: what Markdown emits, a little
+# inline markup, and <pre language=...> for highlighting. Scripts, styles and
+# event-handler attributes are stripped.
+POST_ALLOWED_TAGS = COMMENT_ALLOWED_TAGS + [
+    'blockquote', 'br', 'del', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+    'img', 'li', 'ol', 'p', 's', 'sub', 'sup', 'ul']
+POST_ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'abbr': ['title'],
+    'acronym': ['title'],
+    'code': ['class'],
+    'img': ['src', 'alt', 'title'],
+    'ol': ['start'],
+    'pre': ['language'],
+}
+
+# Highlighting for <pre language=...> blocks in posts. Stateless, so shared.
+_CODE_FORMATTER = HtmlFormatter(style='tango', noclasses=True, linenos=True)
+
+
+@functools.lru_cache(maxsize=128)
+def _code_lexer(language):
+    """Look up a Pygments lexer by alias, or None if there is no such lexer.
+
+    The lookup walks Pygments' lexer registry, so hits and misses are cached.
+    """
+    try:
+        return get_lexer_by_name(language)
+    except ClassNotFound:
+        return None
+
+
+# CommonMark renderer for post and comment bodies. Raw HTML is passed through
+# (posts rely on <pre language=...>) and sanitized afterwards.
+# render() keeps its state per call, so one instance serves every thread.
+_MARKDOWN = MarkdownIt('commonmark', {'html': True})
+
+# bleach Cleaner instances are expensive to build (html5lib setup, regex
+# compilation) and not safe to share between threads, so each thread builds
+# one and reuses it.
+_render_state = threading.local()
+
+
+def _comment_cleaner():
+    """Return this thread's comment sanitizer (allow-list plus linkify)."""
+    cleaner = getattr(_render_state, 'comment_cleaner', None)
+    if cleaner is None:
+        cleaner = _render_state.comment_cleaner = bleach.Cleaner(
+            tags=COMMENT_ALLOWED_TAGS, strip=True, filters=[LinkifyFilter])
+    return cleaner
+
+
+def _post_cleaner():
+    """Return this thread's post sanitizer (allow-list, keeps pre[language])."""
+    cleaner = getattr(_render_state, 'post_cleaner', None)
+    if cleaner is None:
+        cleaner = _render_state.post_cleaner = bleach.Cleaner(
+            tags=POST_ALLOWED_TAGS, attributes=POST_ALLOWED_ATTRIBUTES,
+            strip=True)
+    return cleaner
 
 
 class Permission:
@@ -35,35 +118,54 @@ class Permission:
 
 class Follow(db.Model):
     __tablename__ = 'follows'
-    follower_id = db.Column(db.Integer, db.ForeignKey('users.id'),
+    # The primary key already indexes (follower_id, followed_id); this covers
+    # lookups from the followed side (followers lists, is_followed_by).
+    __table_args__ = (
+        db.Index('ix_follows_followed_follower', 'followed_id', 'follower_id'),
+    )
+    follower_id = db.Column(db.Integer,
+                            db.ForeignKey('users.id', ondelete='CASCADE'),
                             primary_key=True)
-    followed_id = db.Column(db.Integer, db.ForeignKey('users.id'),
+    followed_id = db.Column(db.Integer,
+                            db.ForeignKey('users.id', ondelete='CASCADE'),
                             primary_key=True)
-    timestamp = db.Column(db.DateTime, default=pendulum.now)
+    timestamp = db.Column(db.DateTime, default=datetime.now)
 
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    # Serves "comments for a post, in time order" with an index range scan,
+    # and covers post_id lookups on its own.
+    __table_args__ = (
+        db.Index('ix_comments_post_timestamp', 'post_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     body = db.Column(db.Text)
     body_html = db.Column(db.Text)
-    timestamp = db.Column(db.DateTime, index=True, default=pendulum.now)
+    timestamp = db.Column(db.DateTime, index=True, default=datetime.now)
     disabled = db.Column(db.Boolean, default=False)
-    author_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
-    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), index=True)
+    author_id = db.Column(db.Integer,
+                          db.ForeignKey('users.id', ondelete='CASCADE'),
+                          index=True)
+    post_id = db.Column(db.Integer,
+                        db.ForeignKey('posts.id', ondelete='CASCADE'))
 
     @staticmethod
     def on_changed_body(target, value, oldvalue, initiator):
-        allowed_tags = ['a', 'abbr', 'acronym', 'b', 'code', 'em', 'i',
-                        'strong', 'pre']
-        target.body_html = bleach.linkify(bleach.clean(
-            markdown(value or '', output_format='html'),
-            tags=allowed_tags, strip=True))
+        if value is None or not value.strip():
+            target.body_html = ''
+            return
+        target.body_html = _comment_cleaner().clean(_MARKDOWN.render(value))
 
 
 db.event.listen(Comment.body, 'set', Comment.on_changed_body)
 
 
+# Cache key for the (id, name) role list used by admin form select fields.
+_ROLE_CHOICES_KEY = 'roles:choices'
+_ROLE_IDS_KEY = 'roles:ids'
+
+
 class Role(db.Model):
     __tablename__ = 'roles'
     id = db.Column(db.Integer, primary_key=True)
@@ -96,6 +198,56 @@ class Role(db.Model):
             role.default = default
             db.session.add(role)
         db.session.commit()
+        for key in (_ROLE_CHOICES_KEY, _ROLE_IDS_KEY):
+            try:
+                cache.delete(key)
+            except Exception:
+                pass
+
+    @staticmethod
+    def choices():
+        """Return ``(id, name)`` pairs for every role, sorted by name.
+
+        Roles are effectively static, so the list is cached; ``insert_roles``
+        drops it when roles change.
+        """
+        try:
+            choices = cache.get(_ROLE_CHOICES_KEY)
+        except Exception:
+            choices = None
+        if choices is None:
+            choices = [(role.id, role.name)
+                       for role in Role.query.order_by(Role.name).all()]
+            try:
+                cache.set(_ROLE_CHOICES_KEY, choices, timeout=300)
+            except Exception:
+                pass
+        return choices
+
+    @staticmethod
+    def signup_role_ids():
+        """Return ``(default_id, admin_id)``, either of which may be None.
+
+        Both are read in one query and cached alongside ``choices``.
+        """
+        try:
+            ids = cache.get(_ROLE_IDS_KEY)
+        except Exception:
+            ids = None
+        if ids is None:
+            default_id = admin_id = None
+            for role in Role.query.filter(
+                    db.or_(Role.default.is_(True), Role.permissions == 0xff)):
+                if role.default:
+                    default_id = role.id
+                if role.permissions == 0xff:
+                    admin_id = role.id
+            ids = (default_id, admin_id)
+            try:
+                cache.set(_ROLE_IDS_KEY, ids, timeout=300)
+            except Exception:
+                pass
+        return ids
 
 
 class User(UserMixin, db.Model):
@@ -105,12 +257,24 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(64), unique=True, index=True)
     location = db.Column(db.String(64))
     about_me = db.Column(db.Text())
-    member_since = db.Column(db.DateTime(), default=pendulum.now)
-    last_seen = db.Column(db.DateTime(), default=pendulum.now)
+    member_since = db.Column(db.DateTime(), default=datetime.now)
+    last_seen = db.Column(db.DateTime(), default=datetime.now)
     passwd_hash = db.Column(db.String(256))
     role_id = db.Column(db.Integer, db.ForeignKey('roles.id'), index=True)
     confirmed = db.Column(db.Boolean, default=False)
-    posts = db.relationship('Post', backref='author',
+    # MD5 of the lowercased email, kept in step by on_changed_email.
+    avatar_hash = db.Column(db.String(32))
+    # Denormalized counts, maintained by the Post/Follow listeners at the
+    # bottom of this module.
+    post_count = db.Column(db.Integer, default=0, server_default='0',
+                           nullable=False)
+    follower_count = db.Column(db.Integer, default=0, server_default='0',
+                               nullable=False)
+    # Post.author and Comment.author may only resolve from the identity map;
+    # a query that renders authors must eager-load them, or the lazy load
+    # raises instead of quietly issuing one SELECT per row.
+    posts = db.relationship('Post',
+                            backref=db.backref('author', lazy='raise_on_sql'),
                             lazy='dynamic', cascade='all, delete-orphan')
     followed = db.relationship('Follow',
                                foreign_keys=[Follow.follower_id],
@@ -123,16 +287,20 @@ class User(UserMixin, db.Model):
                                 lazy='dynamic',
                                 cascade='all, delete-orphan')
     comments = db.relationship(
-        'Comment', backref='author', lazy='dynamic', cascade='all, delete-orphan')
+        'Comment', backref=db.backref('author', lazy='raise_on_sql'),
+        lazy='dynamic', cascade='all, delete-orphan')
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if self.role is None:
-            if self.email is not None and \
+            default_id, admin_id = Role.signup_role_ids()
+            role_id = default_id
+            if admin_id is not None and self.email is not None and \
                     self.email == current_app.config.get('BLOGIFY_ADMIN'):
-                self.role = Role.query.filter_by(permissions=0xff).first()
-            if self.role is None:
-                self.role = Role.query.filter_by(default=True).first()
+                role_id = admin_id
+            if role_id is not None:
+                # Usually an identity-map hit after signup_role_ids().
+                self.role = db.session.get(Role, role_id)
 
     # -- Serialization -----------------------------------------------------
 
@@ -143,13 +311,20 @@ class User(UserMixin, db.Model):
             'username': self.username,
             'member_since': self.member_since,
             'last_seen': self.last_seen,
-            'post_count': self.posts.count(),
+            'post_count': self.post_count,
         }
 
     # -- Tokens ------------------------------------------------------------
 
-    def _serializer(self):
-        return URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
+    @staticmethod
+    def _serializer():
+        """Return the app's token serializer, built once per app."""
+        app = current_app._get_current_object()
+        serializer = app.extensions.get('token_serializer')
+        if serializer is None:
+            serializer = app.extensions['token_serializer'] = \
+                URLSafeTimedSerializer(app.config['SECRET_KEY'])
+        return serializer
 
     def generate_auth_token(self, expiration=3600):
         """Return a signed, timestamped API token for this user."""
@@ -158,9 +333,8 @@ class User(UserMixin, db.Model):
     @staticmethod
     def verify_auth_token(token, max_age=3600):
         """Return the User for a valid, unexpired token, else None."""
-        serializer = URLSafeTimedSerializer(current_app.config['SECRET_KEY'])
         try:
-            data = serializer.loads(token, max_age=max_age)
+            data = User._serializer().loads(token, max_age=max_age)
         except BadData:
             return None
         return db.session.get(User, data.get('id'))
@@ -176,7 +350,6 @@ class User(UserMixin, db.Model):
         if data.get('confirm') != self.id:
             return False
         self.confirmed = True
-        db.session.add(self)
         db.session.commit()
         return True
 
@@ -189,15 +362,30 @@ class User(UserMixin, db.Model):
 
     @staticmethod
     def add_self_follows():
-        for user in User.query.all():
-            if not user.is_following(user):
-                user.follow(user)
-                db.session.add(user)
+        """Make every user follow themselves, in two set-based statements.
+
+        The bulk INSERT bypasses the Follow listeners, so follower_count is
+        bumped first for exactly the users about to gain the row.
+        """
+        missing = ~db.exists().where(Follow.follower_id == User.id,
+                                     Follow.followed_id == User.id)
+        db.session.execute(
+            db.update(User).where(missing)
+            .values(follower_count=User.follower_count + 1)
+            .execution_options(synchronize_session=False))
+        db.session.execute(
+            db.insert(Follow).from_select(
+                ['follower_id', 'followed_id', 'timestamp'],
+                db.select(User.id, User.id,
+                          db.literal(datetime.now(), db.DateTime)).where(missing)))
         db.session.commit()
 
     def follow(self, user):
-        if not self.is_following(user):
-            db.session.add(Follow(follower=self, followed=user))
+        """Follow ``user``; return False if already following them."""
+        if self.is_following(user):
+            return False
+        db.session.add(Follow(follower=self, followed=user))
+        return True
 
     def unfollow(self, user):
         f = self.followed.filter_by(followed_id=user.id).first()
@@ -207,19 +395,27 @@ class User(UserMixin, db.Model):
     def is_following(self, user):
         if user.id is None:
             return False
-        return self.followed.filter_by(followed_id=user.id).first() is not None
+        return _follow_exists(self.id, user.id)
 
     def is_followed_by(self, user):
         if user.id is None:
             return False
-        return self.followers.filter_by(follower_id=user.id).first() is not None
+        return _follow_exists(user.id, self.id)
 
     # -- Misc --------------------------------------------------------------
 
+    @staticmethod
+    def gravatar_hash(email):
+        return hashlib.md5(email.lower().encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def on_changed_email(target, value, oldvalue, initiator):
+        target.avatar_hash = User.gravatar_hash(value) if value else None
+
     def gravatar(self, size=100, default='identicon', rating='g'):
-        url = 'https://secure.gravatar.com/avatar'
-        email_hash = hashlib.md5(self.email.lower().encode('utf-8')).hexdigest()
-        return f'{url}/{email_hash}?s={size}&d={default}&r={rating}'
+        email_hash = self.avatar_hash or self.gravatar_hash(self.email)
+        return (f'https://secure.gravatar.com/avatar/{email_hash}'
+                f'?s={size}&d={default}&r={rating}')
 
     def can(self, permissions):
         return self.role is not None and \
@@ -229,9 +425,19 @@ class User(UserMixin, db.Model):
         return self.can(Permission.ADMINISTER)
 
     def ping(self):
-        self.last_seen = pendulum.now(tz=pendulum.local_timezone())
-        db.session.add(self)
+        """Refresh last_seen, at most once per BLOGIFY_LAST_SEEN_INTERVAL.
+
+        Every authenticated request pings, so a user seen moments ago is
+        skipped rather than issuing an UPDATE and COMMIT per page view.
+        Returns True if the row was written.
+        """
+        if self.last_seen is not None:
+            age = datetime.now().astimezone() - self.last_seen.astimezone()
+            if age.total_seconds() < current_app.config['BLOGIFY_LAST_SEEN_INTERVAL']:
+                return False
+        self.last_seen = datetime.now()
         db.session.commit()
+        return True
 
     @property
     def password(self):
@@ -239,19 +445,65 @@ class User(UserMixin, db.Model):
 
     @password.setter
     def password(self, password):
-        self.passwd_hash = generate_password_hash(password)
+        self.passwd_hash = _PASSWORD_HASHER.hash(password)
 
     def verify_passwd(self, password):
-        return check_password_hash(self.passwd_hash, password)
+        """Check ``password``, rehashing it if the stored hash is outdated.
+
+        The caller commits the session so an upgraded hash is persisted.
+        """
+        if not self.passwd_hash:
+            return False
+        if not self.passwd_hash.startswith('$argon2'):
+            # Pre-Argon2 Werkzeug hash.
+            if not check_password_hash(self.passwd_hash, password):
+                return False
+            self.password = password
+            return True
+        try:
+            _PASSWORD_HASHER.verify(self.passwd_hash, password)
+        except VerificationError:
+            return False
+        if _PASSWORD_HASHER.check_needs_rehash(self.passwd_hash):
+            self.password = password
+        return True
+
+    @staticmethod
+    def verify_unknown_passwd(password):
+        """Spend a real hash check when no user matched; always False.
+
+        Keeps the response time of a failed lookup in line with a wrong
+        password, so timing doesn't reveal which emails are registered.
+        """
+        try:
+            _PASSWORD_HASHER.verify(_dummy_password_hash(), password)
+        except VerificationError:
+            pass
+        return False
 
     def __repr__(self):
         return f'<User {self.username!r}>'
 
 
+def _follow_exists(follower_id, followed_id):
+    """True if the follow row exists; a single indexed EXISTS probe.
+
+    Unlike loading the row, this skips Follow's joined-eager user loads.
+    """
+    return db.session.query(
+        db.exists().where(Follow.follower_id == follower_id,
+                          Follow.followed_id == followed_id)
+    ).scalar()
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    """Flask-Login hook: load a user by id for the active session."""
-    return db.session.get(User, int(user_id))
+    """Flask-Login hook: load a user by id for the active session.
+
+    The role is joined in, since nearly every page checks permissions and
+    would otherwise lazy-load it with a second query.
+    """
+    return db.session.get(User, int(user_id), options=[joinedload(User.role)])
 
 
 class AnonymousUser(AnonymousUserMixin):
@@ -264,12 +516,23 @@ class AnonymousUser(AnonymousUserMixin):
 
 class Post(db.Model):
     __tablename__ = 'posts'
+    # Serves both the per-author listing and the followed feed's join, which
+    # reads each followed author's posts newest first. Also covers author_id
+    # on its own.
+    __table_args__ = (
+        db.Index('ix_posts_author_timestamp', 'author_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(80))
     body = db.Column(db.Text)
-    timestamp = db.Column(db.DateTime, index=True, default=pendulum.now)
-    author_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    timestamp = db.Column(db.DateTime, index=True, default=datetime.now)
+    author_id = db.Column(db.Integer,
+                          db.ForeignKey('users.id', ondelete='CASCADE'))
     body_html = db.Column(db.Text)
+    # Denormalized COUNT of comments, maintained by the Comment insert/delete
+    # listeners below so pagination and the API never have to count rows.
+    comment_count = db.Column(db.Integer, default=0, server_default='0',
+                              nullable=False)
     comments = db.relationship(
         'Comment', backref='post', lazy='dynamic', cascade='all, delete-orphan')
 
@@ -280,7 +543,7 @@ class Post(db.Model):
             'body': self.body,
             'body_html': self.body_html,
             'timestamp': self.timestamp,
-            'comment_count': self.comments.count(),
+            'comment_count': self.comment_count,
         }
 
     @staticmethod
@@ -295,29 +558,77 @@ class Post(db.Model):
     @staticmethod
     def on_changed_body(target, value, oldvalue, initiator):
         """Render markdown to HTML, syntax-highlighting any <pre language=...> blocks."""
-        if not value:
+        if value is None or not value.strip():
             target.body_html = ''
             return
 
-        formatter = HtmlFormatter(style='tango', noclasses=True, linenos=True)
-        soup = BeautifulSoup(value, 'html.parser')
-        rendered = str(soup)
+        # Markdown runs first: CommonMark ends most raw HTML blocks at a blank
+        # line, which would split highlighted code, but keeps a <pre> block
+        # whole up to its closing tag.
+        # Sanitize before highlighting, so Pygments' inline styles survive.
+        rendered = _post_cleaner().clean(_MARKDOWN.render(value))
+        if '<pre' not in rendered:
+            target.body_html = rendered
+            return
 
-        for pre in soup.find_all('pre'):
-            language = pre.get('language')
-            if not language:
+        # Parse as a fragment: a bare document would hoist leading comments,
+        # <style>, <link> and the like out of <body>, dropping them below.
+        fragment = LexborHTMLParser(rendered, is_fragment=True)
+        for pre in fragment.css('pre[language]'):
+            language = pre.attributes['language']
+            lexer = _code_lexer(language.lower()) if language else None
+            if lexer is None:
                 continue
-            try:
-                lexer = get_lexer_by_name(language.lower())
-            except Exception:
-                continue
-            highlighted = highlight(pre.get_text().strip(), lexer, formatter)
-            rendered = rendered.replace(str(pre).strip(), highlighted.strip())
+            highlighted = highlight(pre.text().strip(), lexer, _CODE_FORMATTER)
+            # Swap the node in place; the tree is serialized once below.
+            pre.replace_with(LexborHTMLParser(highlighted.strip()).body.child)
 
-        target.body_html = markdown(rendered, output_format='html')
+        target.body_html = fragment.html
 
 
 db.event.listen(Post.body, 'set', Post.on_changed_body)
+db.event.listen(User.email, 'set', User.on_changed_email)
+
+
+def _adjust_count(connection, column, row_id, delta):
+    """Shift a denormalized counter column on one row inside the current flush."""
+    if row_id is None:
+        return
+    table = column.table
+    connection.execute(
+        table.update()
+        .where(table.c.id == row_id)
+        .values({column: column + delta}))
+
+
+@db.event.listens_for(Comment, 'after_insert')
+def _comment_inserted(mapper, connection, target):
+    _adjust_count(connection, Post.__table__.c.comment_count, target.post_id, 1)
+
+
+@db.event.listens_for(Comment, 'after_delete')
+def _comment_deleted(mapper, connection, target):
+    _adjust_count(connection, Post.__table__.c.comment_count, target.post_id, -1)
+
+
+@db.event.listens_for(Post, 'after_insert')
+def _post_inserted(mapper, connection, target):
+    _adjust_count(connection, User.__table__.c.post_count, target.author_id, 1)
+
+
+@db.event.listens_for(Post, 'after_delete')
+def _post_deleted(mapper, connection, target):
+    _adjust_count(connection, User.__table__.c.post_count, target.author_id, -1)
+
+
+@db.event.listens_for(Follow, 'after_insert')
+def _follow_inserted(mapper, connection, target):
+    _adjust_count(connection, User.__table__.c.follower_count, target.followed_id, 1)
+
+
+@db.event.listens_for(Follow, 'after_delete')
+def _follow_deleted(mapper, connection, target):
+    _adjust_count(connection, User.__table__.c.follower_count, target.followed_id, -1)
 
 
 def _endpoint_exists(endpoint):
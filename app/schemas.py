@@ -24,10 +24,7 @@ class PostSchema(Schema):
     body_html = fields.Str(dump_only=True)
     timestamp = fields.DateTime(dump_only=True)
     author = fields.Str(attribute="author.username", dump_only=True)
-    comment_count = fields.Method("get_comment_count", dump_only=True)
-
-    def get_comment_count(self, obj):
-        return obj.comments.count()
+    comment_count = fields.Int(dump_only=True)
 
 
 class UserSchema(Schema):
@@ -37,10 +34,7 @@ class UserSchema(Schema):
     username = fields.Str(dump_only=True)
     member_since = fields.DateTime(dump_only=True)
     last_seen = fields.DateTime(dump_only=True)
-    post_count = fields.Method("get_post_count", dump_only=True)
-
-    def get_post_count(self, obj):
-        return obj.posts.count()
+    post_count = fields.Int(dump_only=True)
 
 
 class CommentSchema(Schema):
@@ -1,18 +1,26 @@
 """Business logic for comments."""
 from __future__ import annotations
 
+from sqlalchemy.orm import joinedload
+
 from .. import db
 from ..models import Comment, Post
 
 
 def get_comment(comment_id: int) -> Comment | None:
-    return db.session.get(Comment, comment_id)
+    return db.session.get(Comment, comment_id, options=[joinedload(Comment.author)])
 
 
 def list_comments_for_post(post: Post, page: int, per_page: int):
-    """Return a pagination object of a post's comments, oldest first."""
+    """Return a pagination object of a post's comments, oldest first.
+
+    Authors are joined in so rendering a page doesn't lazy-load one user per
+    comment.
+    """
     return (
-        post.comments.order_by(Comment.timestamp.asc())
+        Comment.query.filter_by(post_id=post.id)
+        .options(joinedload(Comment.author))
+        .order_by(Comment.timestamp.asc())
         .paginate(page=page, per_page=per_page, error_out=False)
     )
 
@@ -20,7 +28,8 @@ def list_comments_for_post(post: Post, page: int, per_page: int):
 def list_all_comments(page: int, per_page: int):
     """Return a pagination object of all comments, newest first (moderation)."""
     return (
-        Comment.query.order_by(Comment.timestamp.desc())
+        Comment.query.options(joinedload(Comment.author))
+        .order_by(Comment.timestamp.desc())
         .paginate(page=page, per_page=per_page, error_out=False)
     )
 
@@ -34,7 +43,6 @@ def create_comment(*, body: str, post: Post, author) -> Comment:
 
 def set_disabled(comment: Comment, disabled: bool) -> Comment:
     comment.disabled = disabled
-    db.session.add(comment)
     db.session.commit()
     return comment
 
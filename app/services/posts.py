@@ -1,6 +1,11 @@
 """Business logic for posts."""
 from __future__ import annotations
 
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy.orm import joinedload, selectinload
+
 from .. import cache, db
 from ..models import Post
 
@@ -10,18 +15,64 @@ _FEED_NAMESPACE = "posts:feed"
 
 
 def get_post(post_id: int) -> Post | None:
-    """Return a post by id, or None."""
-    return db.session.get(Post, post_id)
+    """Return a post by id, with its author, or None."""
+    return db.session.get(Post, post_id, options=[joinedload(Post.author)])
 
 
 def list_posts(page: int, per_page: int):
     """Return a pagination object of posts, newest first."""
     return (
-        Post.query.order_by(Post.timestamp.desc())
+        Post.query.options(selectinload(Post.author))
+        .order_by(Post.timestamp.desc())
         .paginate(page=page, per_page=per_page, error_out=False)
     )
 
 
+class FeedPage(NamedTuple):
+    """One keyset-paginated page of posts, newest first.
+
+    ``older``/``newer`` are ``(timestamp, id)`` cursors for the neighbouring
+    pages, or None when there is nothing further in that direction.
+    """
+
+    items: list[Post]
+    older: tuple[datetime, int] | None
+    newer: tuple[datetime, int] | None
+
+
+def keyset_page(query, per_page: int, *, after: tuple[datetime, int] | None = None,
+                before: tuple[datetime, int] | None = None) -> FeedPage:
+    """Return the page of ``query`` just older than ``after`` (or newer than ``before``).
+
+    Seeks on ``(timestamp, id)`` instead of using OFFSET, so a deep page costs
+    the same as the first one. One extra row is fetched to learn whether
+    another page exists, which avoids a COUNT(*).
+    """
+    key = db.tuple_(Post.timestamp, Post.id)
+    if before is not None:
+        rows = (query.filter(key > before)
+                .order_by(Post.timestamp.asc(), Post.id.asc())
+                .limit(per_page + 1).all())
+        has_newer = len(rows) > per_page
+        items = rows[:per_page][::-1]
+        has_older = True
+    else:
+        if after is not None:
+            query = query.filter(key < after)
+        rows = (query.order_by(Post.timestamp.desc(), Post.id.desc())
+                .limit(per_page + 1).all())
+        has_older = len(rows) > per_page
+        items = rows[:per_page]
+        has_newer = after is not None
+    if not items:
+        return FeedPage(items, None, None)
+    return FeedPage(
+        items,
+        (items[-1].timestamp, items[-1].id) if has_older else None,
+        (items[0].timestamp, items[0].id) if has_newer else None,
+    )
+
+
 def list_feed_ids(page: int, per_page: int):
     """Return cached (post_ids, total) for a feed page.
 
@@ -63,7 +114,6 @@ def update_post(post: Post, *, title: str | None = None, body: str | None = None
         post.title = title
     if body is not None:
         post.body = body
-    db.session.add(post)
     db.session.commit()
     invalidate_feed()
     return post
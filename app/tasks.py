@@ -38,17 +38,7 @@ def init_celery(app):
 def send_email_task(to, subject, template, **kwargs):
     """Render and send an email off the request thread."""
     # Imported here to avoid a circular import at module load time.
-    from flask import current_app, render_template
-    from flask_mail import Message
-
     from . import mail
+    from .email import build_message
 
-    prefix = current_app.config['BLOGIFY_MAIL_SUBJECT_PREFIX']
-    message = Message(
-        f"{prefix} {subject}",
-        sender=current_app.config['BLOGIFY_MAIL_SENDER'],
-        recipients=[to],
-    )
-    message.body = render_template(f"{template}.txt", **kwargs)
-    message.html = render_template(f"{template}.html", **kwargs)
-    mail.send(message)
+    mail.send(build_message(to, subject, template, **kwargs))
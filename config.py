@@ -44,6 +44,9 @@ class Config:
     BLOGIFY_POSTS_PER_PAGE = int(os.environ.get("BLOGIFY_POSTS_PER_PAGE", "5"))
     BLOGIFY_COMMENTS_PER_PAGE = int(os.environ.get("BLOGIFY_COMMENTS_PER_PAGE", "5"))
 
+    # Minimum seconds between last_seen writes for an active user.
+    BLOGIFY_LAST_SEEN_INTERVAL = int(os.environ.get("BLOGIFY_LAST_SEEN_INTERVAL", "60"))
+
     # Redis / cache / Celery
     REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
     CACHE_TYPE = os.environ.get("CACHE_TYPE", "SimpleCache")
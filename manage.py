@@ -5,6 +5,8 @@ module directly. Loads a local .env file if python-dotenv is available.
 """
 import os
 
+import click
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -33,6 +35,21 @@ def test():
     raise SystemExit(pytest.main(['-q']))
 
 
+@app.cli.command('delete-records')
+@click.confirmation_option(
+    prompt='Delete all users, posts, comments and follows?')
+def delete_records():
+    """Delete all users and their posts, comments and follows.
+
+    Issues one bulk DELETE per table, children first, instead of loading
+    every user and letting the ORM cascade walk their collections. Roles
+    are kept.
+    """
+    for model in (Comment, Post, Follow, User):
+        db.session.execute(db.delete(model))
+    db.session.commit()
+
+
 @app.cli.command('deploy')
 def deploy():
     """Run deployment tasks: migrate to head and seed built-in roles."""
@@ -0,0 +1,51 @@
+"""cascade deletes on user and post foreign keys
+
+Revision ID: 0b7d5e2c9a18
+Revises: f1a6c0d93e47
+Create Date: 2026-10-15 11:41:12.604813
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d5e2c9a18'
+down_revision = 'f1a6c0d93e47'
+branch_labels = None
+depends_on = None
+
+# The original constraints were created unnamed; SQLite batch mode needs a
+# naming convention to address them, other backends report their own names.
+naming_convention = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+foreign_keys = {
+    'follows': [('follower_id', 'users'), ('followed_id', 'users')],
+    'posts': [('author_id', 'users')],
+    'comments': [('author_id', 'users'), ('post_id', 'posts')],
+}
+
+
+def _replace_foreign_keys(ondelete):
+    inspector = sa.inspect(op.get_bind())
+    for table, columns in foreign_keys.items():
+        existing = {fk['constrained_columns'][0]: fk['name']
+                    for fk in inspector.get_foreign_keys(table)}
+        with op.batch_alter_table(table, schema=None,
+                                  naming_convention=naming_convention) as batch_op:
+            for column, referred in columns:
+                name = f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(existing.get(column) or name,
+                                         type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'],
+                                            ondelete=ondelete)
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
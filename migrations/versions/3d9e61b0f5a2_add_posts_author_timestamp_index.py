@@ -0,0 +1,28 @@
+"""replace posts author_id index with (author_id, timestamp)
+
+Revision ID: 3d9e61b0f5a2
+Revises: 0b7d5e2c9a18
+Create Date: 2026-10-15 11:58:27.140956
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9e61b0f5a2'
+down_revision = '0b7d5e2c9a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.create_index('ix_posts_author_timestamp', ['author_id', 'timestamp'], unique=False)
+        batch_op.drop_index('ix_posts_author_id')
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.create_index('ix_posts_author_id', ['author_id'], unique=False)
+        batch_op.drop_index('ix_posts_author_timestamp')
@@ -0,0 +1,33 @@
+"""add cached comment count to posts
+
+Revision ID: 5b1e0c7d4a2f
+Revises: 292bfd355777
+Create Date: 2026-10-15 09:52:41.304118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e0c7d4a2f'
+down_revision = '292bfd355777'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(),
+                                      server_default='0', nullable=False))
+
+    # Backfill from the existing comments.
+    op.execute(
+        'UPDATE posts SET comment_count = '
+        '(SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('comment_count')
@@ -0,0 +1,26 @@
+"""drop comments post_id index covered by (post_id, timestamp)
+
+Revision ID: 8c2f4a7e1b63
+Revises: 3d9e61b0f5a2
+Create Date: 2026-10-15 12:36:09.482571
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2f4a7e1b63'
+down_revision = '3d9e61b0f5a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index('ix_comments_post_id')
+
+
+def downgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index('ix_comments_post_id', ['post_id'], unique=False)
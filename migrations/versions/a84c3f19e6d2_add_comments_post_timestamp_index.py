@@ -0,0 +1,26 @@
+"""add comments (post_id, timestamp) index
+
+Revision ID: a84c3f19e6d2
+Revises: 5b1e0c7d4a2f
+Create Date: 2026-10-15 10:04:12.518730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a84c3f19e6d2'
+down_revision = '5b1e0c7d4a2f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index('ix_comments_post_timestamp', ['post_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index('ix_comments_post_timestamp')
@@ -0,0 +1,37 @@
+"""add cached post and follower counts to users
+
+Revision ID: c37d9e2b8f14
+Revises: a84c3f19e6d2
+Create Date: 2026-10-15 10:31:56.802455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c37d9e2b8f14'
+down_revision = 'a84c3f19e6d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('post_count', sa.Integer(),
+                                      server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('follower_count', sa.Integer(),
+                                      server_default='0', nullable=False))
+
+    # Backfill from the existing posts and follows.
+    op.execute(
+        'UPDATE users SET '
+        'post_count = (SELECT COUNT(*) FROM posts WHERE posts.author_id = users.id), '
+        'follower_count = (SELECT COUNT(*) FROM follows WHERE follows.followed_id = users.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('follower_count')
+        batch_op.drop_column('post_count')
@@ -0,0 +1,26 @@
+"""add follows (followed_id, follower_id) index
+
+Revision ID: e5f20b7a9c31
+Revises: c37d9e2b8f14
+Create Date: 2026-10-15 10:58:03.117642
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f20b7a9c31'
+down_revision = 'c37d9e2b8f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('follows', schema=None) as batch_op:
+        batch_op.create_index('ix_follows_followed_follower', ['followed_id', 'follower_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('follows', schema=None) as batch_op:
+        batch_op.drop_index('ix_follows_followed_follower')
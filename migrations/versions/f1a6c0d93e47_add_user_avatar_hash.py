@@ -0,0 +1,41 @@
+"""add cached gravatar hash to users
+
+Revision ID: f1a6c0d93e47
+Revises: e5f20b7a9c31
+Create Date: 2026-10-15 11:24:40.318207
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6c0d93e47'
+down_revision = 'e5f20b7a9c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('avatar_hash', sa.String(length=32), nullable=True))
+
+    # Backfill in Python; MD5 is not available in SQL on every backend.
+    users = sa.table('users', sa.column('id', sa.Integer),
+                     sa.column('email', sa.String),
+                     sa.column('avatar_hash', sa.String))
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.select(users.c.id, users.c.email).where(users.c.email.isnot(None))
+    ).all()
+    for user_id, email in rows:
+        conn.execute(
+            users.update().where(users.c.id == user_id).values(
+                avatar_hash=hashlib.md5(email.lower().encode('utf-8')).hexdigest()))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('avatar_hash')
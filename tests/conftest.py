@@ -6,8 +6,9 @@ helpers for creating users and authenticating against the API.
 import base64
 
 import pytest
+from cachelib import SimpleCache
 
-from app import create_app
+from app import cache, create_app
 from app import db as _db
 from app.models import Role, User
 
@@ -30,6 +31,16 @@ def db(app):
     return _db
 
 
+@pytest.fixture
+def real_cache(monkeypatch):
+    """Back the app cache with an in-process store; testing uses NullCache."""
+    store = SimpleCache()
+    monkeypatch.setattr(cache, 'get', store.get)
+    monkeypatch.setattr(cache, 'set', store.set)
+    monkeypatch.setattr(cache, 'delete', store.delete)
+    return store
+
+
 @pytest.fixture
 def client(app):
     return app.test_client()
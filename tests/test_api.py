@@ -107,3 +107,15 @@ def test_comment_permission_enforced(client, make_user, auth_headers):
         json={'body': 'blocked comment'},
     )
     assert resp.status_code == 403
+
+
+def test_counts_in_payloads(client, user, auth_headers):
+    headers = auth_headers('user@example.com', 'password')
+    resp = client.post('/api/v1/posts/', headers=headers,
+                       json={'title': 't', 'body': 'post body'})
+    post_id = resp.get_json()['id']
+    client.post(f'/api/v1/posts/{post_id}/comments/', headers=headers,
+                json={'body': 'a comment'})
+
+    assert client.get(f'/api/v1/posts/{post_id}', headers=headers).get_json()['comment_count'] == 1
+    assert client.get(f'/api/v1/users/{user.id}', headers=headers).get_json()['post_count'] == 1
@@ -0,0 +1,32 @@
+"""Management command tests (manage.py)."""
+from app.models import Comment, Follow, Post, Role, User
+from app.services import comments as comment_service
+from app.services import posts as post_service
+
+
+def _seed(make_user, db):
+    alice = make_user(email='alice@example.com', username='alice')
+    bob = make_user(email='bob@example.com', username='bob')
+    alice.follow(bob)
+    db.session.commit()
+    post = post_service.create_post(title='P', body='body', author=bob)
+    comment_service.create_comment(body='hi', post=post, author=alice)
+
+
+def test_delete_records_requires_confirmation(app, make_user, db):
+    from manage import delete_records
+    _seed(make_user, db)
+    result = app.test_cli_runner().invoke(delete_records, input='n\n')
+    assert result.exit_code != 0
+    assert User.query.count() == 2
+
+
+def test_delete_records_keeps_roles(app, make_user, db):
+    from manage import delete_records
+    _seed(make_user, db)
+    result = app.test_cli_runner().invoke(delete_records, ['--yes'])
+    assert result.exit_code == 0, result.output
+    db.session.expire_all()
+    for model in (Comment, Post, Follow, User):
+        assert model.query.count() == 0
+    assert Role.query.count() == 3
@@ -0,0 +1,35 @@
+"""Email dispatch tests."""
+from app import email, mail
+
+
+def test_falls_back_to_thread_when_celery_unavailable(app, user, monkeypatch):
+    def broken_delay(*args, **kwargs):
+        raise RuntimeError('broker down')
+
+    sent = []
+    monkeypatch.setattr(email.send_email_task, 'delay', broken_delay)
+    monkeypatch.setattr(mail, 'send', sent.append)
+
+    with app.test_request_context():
+        future = email.send_email(user.email, 'Confirm Your Account',
+                                  'auth/email/confirm', user=user, token='tok')
+    future.result(timeout=5)
+
+    assert len(sent) == 1
+    assert sent[0].recipients == [user.email]
+    assert 'tok' in sent[0].body
+
+
+def test_task_renders_templates_on_repeat_sends(app, monkeypatch):
+    from app.tasks import send_email_task
+    sent = []
+    monkeypatch.setattr(mail, 'send', sent.append)
+
+    with app.test_request_context():
+        for token in ('tok1', 'tok2'):
+            send_email_task.delay('bob@example.com', 'Confirm Your Account',
+                                  'auth/email/confirm',
+                                  user={'username': 'bob'}, token=token)
+
+    assert [m.subject for m in sent] == ['[Blogify] Confirm Your Account'] * 2
+    assert 'tok2' in sent[1].html
@@ -0,0 +1,25 @@
+"""Template helper tests."""
+from datetime import datetime, timedelta
+
+from app.helper import format_relative_time
+
+
+def _ago(**kwargs):
+    return datetime.now().astimezone() - timedelta(**kwargs)
+
+
+def test_relative_time_ladder():
+    assert format_relative_time(_ago(seconds=0)) == 'a moment'
+    assert format_relative_time(_ago(seconds=1)) == 'a second'
+    assert format_relative_time(_ago(seconds=30)) == '30 seconds'
+    assert format_relative_time(_ago(minutes=1, seconds=5)) == 'a minute'
+    assert format_relative_time(_ago(minutes=5, seconds=1)) == '5 minutes'
+    assert format_relative_time(_ago(hours=1, minutes=1)) == 'an hour'
+    assert format_relative_time(_ago(hours=3, minutes=1)) == '3 hours'
+    assert format_relative_time(_ago(days=2, minutes=1)) == '2 days'
+    assert format_relative_time(_ago(days=400)) == 'a year'
+
+
+def test_relative_time_treats_naive_as_local():
+    naive_local = datetime.now() - timedelta(hours=2, minutes=1)
+    assert format_relative_time(naive_local) == '2 hours'
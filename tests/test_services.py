@@ -1,4 +1,6 @@
 """Unit tests for the service layer (posts and comments)."""
+import pytest
+
 from app.services import comments as comment_service
 from app.services import posts as post_service
 
@@ -35,15 +37,8 @@ def test_feed_reflects_writes(app, user):
     assert total2 == 2
 
 
-def test_feed_cache_invalidation_bumps_version(app, user, monkeypatch):
-    # Swap in a real (in-process) cache to exercise version-based invalidation.
-    from cachelib import SimpleCache
-
-    from app import cache
-    store = SimpleCache()
-    monkeypatch.setattr(cache, 'get', store.get)
-    monkeypatch.setattr(cache, 'set', store.set)
-
+def test_feed_cache_invalidation_bumps_version(app, user, real_cache):
+    # A real (in-process) cache exercises version-based invalidation.
     post_service.create_post(title='One', body='one', author=user)
     post_service.list_feed_ids(page=1, per_page=10)  # populate cache
     version_before = post_service.feed_version()
@@ -65,3 +60,158 @@ def test_moderation_toggle(app, user):
     assert comment.disabled is True
     comment_service.set_disabled(comment, False)
     assert comment.disabled is False
+
+
+def test_list_comments_for_post_oldest_first(app, user):
+    post = post_service.create_post(title='P', body='body', author=user)
+    comment_service.create_comment(body='first', post=post, author=user)
+    comment_service.create_comment(body='second', post=post, author=user)
+    pagination = comment_service.list_comments_for_post(post, page=1, per_page=10)
+    assert [c.body for c in pagination.items] == ['first', 'second']
+    assert pagination.items[0].author is user
+
+
+def test_comment_count_tracks_inserts_and_deletes(app, user):
+    post = post_service.create_post(title='P', body='body', author=user)
+    assert post.comment_count == 0
+    first = comment_service.create_comment(body='one', post=post, author=user)
+    comment_service.create_comment(body='two', post=post, author=user)
+    assert post.comment_count == 2
+    comment_service.delete_comment(first)
+    assert post.comment_count == 1
+
+
+def test_keyset_page_walks_older_and_newer(app, user):
+    from app.models import Post
+    for i in range(5):
+        post_service.create_post(title=f'p{i}', body='body', author=user)
+
+    first = post_service.keyset_page(Post.query, per_page=2)
+    assert [p.title for p in first.items] == ['p4', 'p3']
+    assert first.newer is None
+
+    second = post_service.keyset_page(Post.query, per_page=2, after=first.older)
+    assert [p.title for p in second.items] == ['p2', 'p1']
+
+    last = post_service.keyset_page(Post.query, per_page=2, after=second.older)
+    assert [p.title for p in last.items] == ['p0']
+    assert last.older is None
+
+    back = post_service.keyset_page(Post.query, per_page=2, before=second.newer)
+    assert [p.title for p in back.items] == ['p4', 'p3']
+    assert back.newer is None
+
+
+def test_comment_body_is_rendered_and_sanitized(app, user):
+    post = post_service.create_post(title='P', body='body', author=user)
+    comment = comment_service.create_comment(
+        body='*hi* see http://example.com <script>x()</script>', post=post, author=user)
+    assert '<em>hi</em>' in comment.body_html
+    assert '<a href="http://example.com" rel="nofollow">' in comment.body_html
+    assert '<script>' not in comment.body_html
+
+
+def test_post_body_highlights_code_blocks(app, user):
+    post = post_service.create_post(
+        title='P', body='Intro\n\n<pre language="python">x = 1</pre>', author=user)
+    assert '<p>Intro</p>' in post.body_html
+    assert 'language="python"' not in post.body_html
+    assert 'highlight' in post.body_html
+
+
+def test_post_body_highlights_repeated_code_blocks(app, user):
+    block = '<pre language="python">x = 1</pre>'
+    post = post_service.create_post(
+        title='P', body=f'{block}\n\nand again\n\n{block}', author=user)
+    assert 'language="python"' not in post.body_html
+    assert post.body_html.count('class="highlight"') == 2
+
+
+def test_post_body_leaves_unknown_languages_alone(app, user):
+    post = post_service.create_post(
+        title='P', body='<pre language="no-such-lang">x = 1</pre>', author=user)
+    assert 'class="highlight"' not in post.body_html
+    assert 'x = 1' in post.body_html
+
+
+def test_post_body_keeps_code_blocks_with_blank_lines_whole(app, user):
+    post = post_service.create_post(
+        title='P', body='<pre language="python">a = 1\n\nb = *2*</pre>\n\nAfter',
+        author=user)
+    assert post.body_html.count('class="highlight"') == 1
+    assert '<em>' not in post.body_html
+    assert '<p>After</p>' in post.body_html
+
+
+def test_post_author_must_be_eager_loaded(app, user, db):
+    import sqlalchemy.exc
+
+    from app.models import Post
+    post = post_service.create_post(title='P', body='b', author=user)
+    post_id, author_id = post.id, user.id
+    db.session.expunge_all()
+    with pytest.raises(sqlalchemy.exc.InvalidRequestError):
+        _ = db.session.get(Post, post_id).author
+    db.session.expunge_all()
+    assert post_service.get_post(post_id).author.id == author_id
+
+
+def test_blank_bodies_render_empty(app, user):
+    post = post_service.create_post(title='P', body='  \n\t ', author=user)
+    assert post.body_html == ''
+    comment = comment_service.create_comment(body=' \n ', post=post, author=user)
+    assert comment.body_html == ''
+
+
+def test_post_body_renders_fenced_code(app, user):
+    post = post_service.create_post(
+        title='P', body='```\n<b>not bold</b>\n```', author=user)
+    assert '<pre><code>&lt;b&gt;not bold&lt;/b&gt;\n</code></pre>' in post.body_html
+
+
+def test_post_body_escapes_highlighted_code_once(app, user):
+    post = post_service.create_post(
+        title='P', body='<pre language="python">a &lt; b and c &amp; d</pre>',
+        author=user)
+    assert '&amp;lt;' not in post.body_html
+    assert '&amp;amp;' not in post.body_html
+    assert '&lt;' in post.body_html
+
+
+def test_post_body_keeps_leading_nodes_next_to_code_blocks(app, user):
+    post = post_service.create_post(
+        title='P',
+        body='<!-- draft note -->\n\n<style>p { color: red; }</style>\n\n'
+             'Intro\n\n<pre language="python">x = 1</pre>',
+        author=user)
+    # The sanitizer drops the comment and <style>; the rest must survive.
+    assert '<!--' not in post.body_html
+    assert '<style>' not in post.body_html
+    assert '<p>Intro</p>' in post.body_html
+    assert 'class="highlight"' in post.body_html
+
+
+def test_post_body_survives_stray_closing_tags_next_to_code_blocks(app, user):
+    post = post_service.create_post(
+        title='P',
+        body='Intro\n\n</div></div>\n\n<pre language="python">x = 1</pre>\n\nTail',
+        author=user)
+    assert '<p>Intro</p>' in post.body_html
+    assert 'class="highlight"' in post.body_html
+    assert '<p>Tail</p>' in post.body_html
+
+
+def test_post_body_is_sanitized_but_still_highlighted(app, user):
+    post = post_service.create_post(
+        title='P',
+        body='<script>alert(1)</script>\n\n<p onclick="steal()">Hi</p>\n\n'
+             '<img src="x.png" onerror="steal()">\n\n'
+             '<pre language="python" onmouseover="steal()">x = 1</pre>',
+        author=user)
+    assert '<script>' not in post.body_html
+    assert 'onclick' not in post.body_html
+    assert 'onerror' not in post.body_html
+    assert 'onmouseover' not in post.body_html
+    assert '<p>Hi</p>' in post.body_html
+    assert 'class="highlight"' in post.body_html
+    assert 'style=' in post.body_html  # Pygments' inline styles are kept
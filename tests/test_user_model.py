@@ -1,4 +1,6 @@
 """User model and permission tests."""
+import hashlib
+
 import pytest
 
 from app.models import AnonymousUser, Permission, Role, User
@@ -71,3 +73,128 @@ def test_auth_token_roundtrip(app):
 
 def test_invalid_auth_token_returns_none(app):
     assert User.verify_auth_token('not-a-real-token') is None
+
+
+def test_role_choices_cached_until_roles_change(app, real_cache):
+    names = [name for _, name in Role.choices()]
+    assert names == ['Administrator', 'Moderator', 'User']
+    assert real_cache.get('roles:choices') is not None
+    Role.insert_roles()
+    assert real_cache.get('roles:choices') is None
+
+
+def test_post_and_follower_counts(app, db):
+    from app.models import Post
+    alice = User(email='alice@example.com', username='alice', password='cat')
+    bob = User(email='bob@example.com', username='bob', password='cat')
+    db.session.add_all([alice, bob])
+    db.session.commit()
+
+    post = Post(body='hello', author=alice)
+    db.session.add(post)
+    bob.follow(alice)
+    db.session.commit()
+    assert alice.post_count == 1
+    assert alice.follower_count == 1
+    assert bob.follower_count == 0
+
+    db.session.delete(post)
+    bob.unfollow(alice)
+    db.session.commit()
+    assert alice.post_count == 0
+    assert alice.follower_count == 0
+
+
+def test_follow_checks(app, db):
+    alice = User(email='alice@example.com', username='alice', password='cat')
+    bob = User(email='bob@example.com', username='bob', password='cat')
+    db.session.add_all([alice, bob])
+    db.session.commit()
+    assert not alice.is_following(bob)
+
+    assert alice.follow(bob) is True
+    db.session.commit()
+    assert alice.is_following(bob)
+    assert bob.is_followed_by(alice)
+    assert not bob.is_following(alice)
+    assert alice.follow(bob) is False
+
+
+def test_legacy_werkzeug_hash_is_upgraded(app):
+    from werkzeug.security import generate_password_hash
+    u = User(password='cat')
+    u.passwd_hash = generate_password_hash('cat')
+    assert not u.verify_passwd('dog')
+    assert not u.passwd_hash.startswith('$argon2')
+    assert u.verify_passwd('cat')
+    assert u.passwd_hash.startswith('$argon2id')
+    assert u.verify_passwd('cat')
+
+
+def test_unknown_user_password_check_is_false(app):
+    assert User.verify_unknown_passwd('anything') is False
+
+
+def test_avatar_hash_follows_email(app):
+    u = User(email='John@Example.com', password='cat')
+    assert u.avatar_hash == hashlib.md5(b'john@example.com').hexdigest()
+    assert u.avatar_hash in u.gravatar()
+    u.email = 'other@example.com'
+    assert u.avatar_hash == hashlib.md5(b'other@example.com').hexdigest()
+
+
+def test_token_serializer_is_built_once_per_app(app, db):
+    u = User(email='t@example.com', password='cat')
+    db.session.add(u)
+    db.session.commit()
+    token = u.generate_auth_token()
+    assert 'token_serializer' in app.extensions
+    assert User.verify_auth_token(token) == u
+    assert User._serializer() is app.extensions['token_serializer']
+
+
+def test_ping_is_throttled(app, db):
+    from datetime import datetime, timedelta
+    u = User(email='p@example.com', password='cat')
+    db.session.add(u)
+    db.session.commit()
+    assert not u.ping()
+    u.last_seen = datetime.now() - timedelta(hours=1)
+    assert u.ping()
+
+
+def test_add_self_follows(app, db):
+    alice = User(email='a@example.com', username='alice', password='cat')
+    bob = User(email='b@example.com', username='bob', password='cat')
+    db.session.add_all([alice, bob])
+    db.session.commit()
+    alice.follow(alice)
+    db.session.commit()
+    User.add_self_follows()
+    User.add_self_follows()
+    assert alice.is_following(alice) and bob.is_following(bob)
+    db.session.refresh(alice)
+    db.session.refresh(bob)
+    assert alice.follower_count == 1
+    assert bob.follower_count == 1
+
+
+def test_signup_role_ids_cached_until_roles_change(app, real_cache):
+    app.config['BLOGIFY_ADMIN'] = 'admin@example.com'
+    assert User(email='someone@example.com').role.name == 'User'
+    assert User(email='admin@example.com').role.name == 'Administrator'
+    assert real_cache.get('roles:ids') is not None
+    Role.insert_roles()
+    assert real_cache.get('roles:ids') is None
+
+
+def test_user_loader_joins_role(app, db):
+    from app.models import load_user
+    u = User(email='r@example.com', password='cat')
+    db.session.add(u)
+    db.session.commit()
+    user_id = u.id
+    db.session.expunge_all()
+    loaded = load_user(str(user_id))
+    assert 'role' in loaded.__dict__
+    assert loaded.can(Permission.WRITE)
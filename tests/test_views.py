@@ -0,0 +1,134 @@
+"""HTML view tests (auth flows and the main blueprint)."""
+
+
+def login(client, email='user@example.com', password='password'):
+    """Log in through the real auth view so session protection is satisfied."""
+    return client.post('/auth/login', data={'email': email, 'password': password})
+
+
+def test_login(client, user):
+    resp = login(client)
+    assert resp.status_code == 302
+
+
+def test_login_rejects_malformed_email(client, user):
+    resp = client.post('/auth/login', data={
+        'email': 'not-an-email', 'password': 'password'})
+    assert resp.status_code == 200
+    assert b'Invalid email address.' in resp.data
+
+
+def test_register_rejects_taken_email_and_username(client, user):
+    resp = client.post('/auth/register', data={
+        'email': 'user@example.com', 'username': 'user',
+        'password': 'pw', 'password2': 'pw'})
+    assert resp.status_code == 200
+    assert b'Email already registered.' in resp.data
+    assert b'Username already in use.' in resp.data
+
+
+def test_change_password_updates_current_user(client, user):
+    login(client)
+    resp = client.post('/auth/change_password', data={
+        'password': 'new-pw', 'password2': 'new-pw'})
+    assert resp.status_code == 302
+    assert user.verify_passwd('new-pw')
+
+
+def test_moderator_can_disable_and_enable_comment(client, make_user):
+    from app.services import comments as comment_service
+    from app.services import posts as post_service
+
+    mod = make_user(email='mod@example.com', username='mod', role_name='Moderator')
+    post = post_service.create_post(title='P', body='body', author=mod)
+    comment = comment_service.create_comment(body='hi', post=post, author=mod)
+    login(client, email='mod@example.com')
+
+    assert client.get(f'/moderate/disable/{comment.id}').status_code == 302
+    assert comment.disabled is True
+    assert client.get(f'/moderate/enable/{comment.id}').status_code == 302
+    assert comment.disabled is False
+
+
+def test_followers_page_lists_followers(client, make_user):
+    alice = make_user(email='alice@example.com', username='alice')
+    bob = make_user(email='bob@example.com', username='bob')
+    bob.follow(alice)
+    from app import db
+    db.session.commit()
+    resp = client.get('/followers/alice')
+    assert resp.status_code == 200
+    assert b'bob' in resp.data
+
+
+def test_index_older_link_follows_cursor(client, user, app):
+    import html
+    import re
+
+    from app.services import posts as post_service
+    app.config['BLOGIFY_POSTS_PER_PAGE'] = 1
+    post_service.create_post(title='older post', body='b', author=user)
+    post_service.create_post(title='newer post', body='b', author=user)
+
+    resp = client.get('/')
+    assert b'newer post' in resp.data and b'older post' not in resp.data
+    older_url = re.search(r'href="([^"]*after_ts[^"]*)"', resp.get_data(as_text=True))
+    resp = client.get(html.unescape(older_url.group(1)))
+    assert b'older post' in resp.data and b'newer post' not in resp.data
+
+
+def test_last_seen_is_only_refreshed_when_stale(client, user, db):
+    from datetime import datetime, timedelta
+    login(client)
+
+    recent = user.last_seen
+    client.get('/')
+    assert user.last_seen == recent
+
+    user.last_seen = datetime.now() - timedelta(hours=2)
+    db.session.commit()
+    client.get('/')
+    assert datetime.now() - user.last_seen < timedelta(minutes=1)
+
+
+def test_feed_toggle_renders_without_redirect(client, make_user, db):
+    from app.services import posts as post_service
+    make_user()
+    other = make_user(email='other@example.com', username='other')
+    post_service.create_post(title='unfollowed post', body='b', author=other)
+    login(client)
+
+    resp = client.get('/followed')
+    assert resp.status_code == 200
+    assert 'show_followed=1' in resp.headers['Set-Cookie']
+    assert b'unfollowed post' not in resp.data
+
+    resp = client.get('/all')
+    assert resp.status_code == 200
+    assert b'unfollowed post' in resp.data
+
+
+def test_post_page_last_page_shows_newest_comment(client, user, app):
+    from app.services import comments as comment_service
+    from app.services import posts as post_service
+    app.config['BLOGIFY_COMMENTS_PER_PAGE'] = 2
+    post = post_service.create_post(title='P', body='body', author=user)
+    for body in ('first', 'second', 'third', 'fourth'):
+        comment_service.create_comment(body=body, post=post, author=user)
+
+    resp = client.get(f'/post/{post.id}?page=-1')
+    assert resp.status_code == 200
+    assert b'fourth' in resp.data and b'second' not in resp.data
+
+
+def test_follow_then_follow_again(client, make_user):
+    me = make_user()
+    other = make_user(email='other@example.com', username='other')
+    login(client)
+
+    client.get('/follow/other')
+    assert me.is_following(other)
+    assert other.follower_count == 1
+    resp = client.get('/follow/other', follow_redirects=True)
+    assert b'You are already following this user.' in resp.data
+    assert other.follower_count == 1